@@ -9,6 +9,8 @@ TARGET_BASE_DIR = "C:\\DuplicateCheckResults"
 # --- Folder Names ---
 # The name of the subfolder within TARGET_BASE_DIR where duplicates will be moved.
 DUPLICATES_FOLDER_NAME = "Duplicates"
+# The full, normalized path of the duplicates folder, computed once.
+DUPLICATES_FOLDER = os.path.normpath(os.path.join(TARGET_BASE_DIR, DUPLICATES_FOLDER_NAME))
 
 # --- Logging ---
 # The subfolder for log files.
@@ -18,6 +20,10 @@ LOG_FILENAME = "duplicate_check.log"
 # The log file specifically for performance metrics.
 PERFORMANCE_LOG_FILENAME = "performance_log.txt"
 
+# --- Caching ---
+# The sqlite database where image hashes are kept between runs, so unchanged files are not hashed again.
+HASH_CACHE_PATH = os.path.join(TARGET_BASE_DIR, ".hash_cache.sqlite")
+
 # --- Filtering ---
 # Files smaller than this value (in bytes) will be ignored during the scan.
 # Default is 1 MB.
@@ -25,7 +31,7 @@ MIN_SIZE_BYTES = 1 * 1024 * 1024
 
 # --- File Types ---
 # A set of allowed image file extensions to be processed by the application.
-ALLOWED_IMAGE_EXTENSIONS = {
+ALLOWED_IMAGE_EXTENSIONS = frozenset({
     '.jpg', '.jpeg', '.png', '.webp', '.gif', '.heic',
     '.tiff', '.bmp', '.jfif', '.dng'
-}
+})
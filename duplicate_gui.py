@@ -2,19 +2,20 @@
 
 import sys
 import os
+import heapq
 import multiprocessing
 import logging
 import time
 from datetime import datetime
 
-from PySide6.QtCore import QThread, Qt
+from PySide6.QtCore import QThread, QThreadPool, QTimer, Qt
 from PySide6.QtWidgets import (
     QApplication, QWidget, QPushButton, QFileDialog,
     QVBoxLayout, QGraphicsDropShadowEffect, QMessageBox
 )
 from PySide6.QtGui import QColor
 from match_engine import MatchEngine
-from config import DUPLICATES_FOLDER_NAME, MIN_SIZE_BYTES, TARGET_BASE_DIR
+from config import DUPLICATES_FOLDER, MIN_SIZE_BYTES
 # --- CHANGED: Importing ActionWorker instead of FileMover ---
 from workers import ActionWorker, DuplicateChecker
 import styles
@@ -24,6 +25,7 @@ from performance_logger import PerformanceLogger
 # --- CHANGED: Importing updated SettingsPanel and StatusPanel ---
 from ui_panels import SettingsPanel, StatusPanel
 from review_dialog import ReviewDialog
+from image_series import PreviewCache, get_thumbnail_size
 from automatic_selector import SelectionStrategy
 
 
@@ -39,14 +41,31 @@ class DuplicateWindow(QWidget):
         self.files_to_sort = {}
         self.current_group_index = -1
         self.folder_path = None
-        self.check_thread = None
-        # --- CHANGED: Renamed thread variable ---
-        self.action_thread = None
+        # Device of the scanned folder, so file actions know whether moves are renames
+        self.source_device = None
+        self.duplicate_checker = None
+        self.action_worker = None
+        # Workers run on the shared pool, so later runs reuse already started threads.
+        # Leave some cores free for the UI thread and the hashing processes.
+        self.thread_pool = QThreadPool.globalInstance()
+        self.thread_pool.setMaxThreadCount(max(2, QThread.idealThreadCount() - 3))
         self.match_engine = MatchEngine()
         self.performance_logger = PerformanceLogger()
         self.active_run_stats = {}
         self.start_time = 0
         self.all_file_data = {}
+        # Thumbnails of the next review group, decoded while the user reviews the current one
+        self.preview_cache = PreviewCache()
+        # Latest progress updates not yet applied to the UI (coalesced per event loop pass)
+        self._pending_progress = None
+        self._pending_download_progress = None
+        self._progress_flush_scheduled = False
+        # Log messages are buffered and appended in one go, to avoid a relayout per message
+        self._log_buffer = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setInterval(100)
+        self._log_timer.timeout.connect(self._flush_log_buffer)
+        self._log_timer.start()
 
         self._setup_styles()
         self.build_ui()
@@ -118,7 +137,12 @@ class DuplicateWindow(QWidget):
         self.settings_panel.unique_version_options_frame.setVisible(show_options)
 
     def append_log_message(self, message):
-        self.status_panel.log_window.append(message)
+        self._log_buffer.append(message)
+
+    def _flush_log_buffer(self):
+        if self._log_buffer:
+            self.status_panel.log_window.append("\n".join(self._log_buffer))
+            self._log_buffer.clear()
 
     def update_threshold_info(self, value):
         self.settings_panel.label_threshold.setText(f"Sensitivity (Distance): {value}")
@@ -156,7 +180,10 @@ class DuplicateWindow(QWidget):
         self.files_for_removal.clear()
         self.files_to_sort.clear()
         self.current_group_index = -1
+        self.source_device = None
+        self.preview_cache.clear()
         self.status_panel.progress_bar.setValue(0)
+        self._log_buffer.clear()
         self.status_panel.log_window.clear()
         self.status_panel.scan_summary_label.setText("Scanning folder, please wait...")
 
@@ -174,25 +201,20 @@ class DuplicateWindow(QWidget):
         logging.info(f"--- Starting new duplicate check ({mode}) for folder: {self.folder_path} ---")
 
         self.match_engine = MatchEngine()
-        self.check_thread = QThread()
         self.duplicate_checker = DuplicateChecker(self.folder_path, threshold_value, mode, strategy)
-        self.duplicate_checker.moveToThread(self.check_thread)
+        signals = self.duplicate_checker.signals
 
-        self.duplicate_checker.scan_summary_ready.connect(self.display_scan_summary)
-        self.duplicate_checker.download_progress.connect(self.handle_download_progress)
-        self.duplicate_checker.progress_updated.connect(self.handle_progress_updated)
-        self.duplicate_checker.error_occurred.connect(self.handle_check_error)
+        signals.scan_summary_ready.connect(self.display_scan_summary)
+        signals.download_progress.connect(self.handle_download_progress)
+        signals.progress_updated.connect(self.handle_progress_updated)
+        signals.error_occurred.connect(self.handle_check_error)
 
         if mode == "Manual review":
-            self.duplicate_checker.manual_check_finished.connect(self.handle_manual_check_finished)
+            signals.manual_check_finished.connect(self.handle_manual_check_finished)
         else:
-            self.duplicate_checker.automatic_selection_finished.connect(self.handle_automatic_selection_finished)
-        
-        self.check_thread.started.connect(self.duplicate_checker.run)
-        self.check_thread.finished.connect(self.check_thread.quit)
-        self.check_thread.finished.connect(self.check_thread.deleteLater)
-        self.check_thread.finished.connect(lambda: setattr(self, 'check_thread', None))
-        self.check_thread.start()
+            signals.automatic_selection_finished.connect(self.handle_automatic_selection_finished)
+
+        self.thread_pool.start(self.duplicate_checker)
 
     def display_scan_summary(self, summary):
         total_files = summary.get('total_files', 0)
@@ -200,24 +222,52 @@ class DuplicateWindow(QWidget):
         other_files = summary.get('other_files', {})
         total_images = sum(image_files.values())
         total_other = sum(other_files.values())
-        html = f"<b>Folder analysis:</b><br>Total {total_files} files found.<hr>"
+        # Partial summaries arrive while the scan is still running
+        scan_complete = summary.get('scan_complete', True)
+        title = "Folder analysis" if scan_complete else "Folder analysis (scanning...)"
+        html = f"<b>{title}:</b><br>Total {total_files} files found.<hr>"
         if image_files:
-            html += f"<b>Image files ({total_images}):</b><ul>" + "".join([f"<li>{ext.upper()}: {count}</li>" for ext, count in sorted(image_files.items())]) + "</ul>"
+            html += f"<b>Image files ({total_images}):</b><ul>" + "".join(f"<li>{ext.upper()}: {count}</li>" for ext, count in sorted(image_files.items())) + "</ul>"
         if other_files:
-            html += f"<b>Other files ({total_other}):</b><ul>" + "".join([f"<li>{ext.upper()}: {count}</li>" for ext, count in sorted(other_files.items())[:5]])
+            # Only the first five extensions are shown, so avoid sorting all of them
+            first_other_files = heapq.nsmallest(5, other_files.items(), key=lambda item: item[0])
+            html += f"<b>Other files ({total_other}):</b><ul>" + "".join(f"<li>{ext.upper()}: {count}</li>" for ext, count in first_other_files)
             if len(other_files) > 5:
                 html += "<li>... and more</li>"
             html += "</ul>"
         self.status_panel.scan_summary_label.setText(html)
+        if not scan_complete:
+            return
+        self.source_device = summary.get('source_device')
         log_text = f"Folder analysis complete: Total {total_files} files. Image files: {total_images}. Other: {total_other}."
         logging.info(log_text)
         self.append_log_message(log_text)
 
     def handle_download_progress(self, current, total):
-        self.status_panel.status.setText(f"Downloading file {current} of {total} from the cloud...")
-        self.status_panel.progress_bar.setValue(int(100 * (current / total)))
-
-    def handle_manual_check_finished(self, check_stats, all_file_data, groups):
+        self._pending_download_progress = (current, total)
+        self._schedule_progress_flush()
+
+    def _schedule_progress_flush(self):
+        """Applies queued progress updates once the event loop is idle, instead of once per signal."""
+        if not self._progress_flush_scheduled:
+            self._progress_flush_scheduled = True
+            QTimer.singleShot(0, self._flush_progress_updates)
+
+    def _flush_progress_updates(self):
+        self._progress_flush_scheduled = False
+        if self._pending_download_progress:
+            current, total = self._pending_download_progress
+            self._pending_download_progress = None
+            self.status_panel.status.setText(f"Downloading file {current} of {total} from the cloud...")
+            self.status_panel.progress_bar.setValue(int(100 * (current / total)))
+        if self._pending_progress:
+            value, text = self._pending_progress
+            self._pending_progress = None
+            self.status_panel.progress_bar.setValue(value)
+            self.status_panel.status.setText(text)
+
+    def handle_manual_check_finished(self, results):
+        check_stats, all_file_data, groups = results.payload
         self.reactivate_ui_after_check()
         self.active_run_stats.update(check_stats)
         self.all_file_data = all_file_data
@@ -241,7 +291,8 @@ class DuplicateWindow(QWidget):
             QMessageBox.information(self, "No Duplicates Found", "The scan completed, but no duplicate groups were found.")
             self.log_performance_if_finished()
 
-    def handle_automatic_selection_finished(self, files_for_removal, files_to_sort, check_stats):
+    def handle_automatic_selection_finished(self, results):
+        files_for_removal, files_to_sort, check_stats = results.payload
         self.reactivate_ui_after_check()
         self.active_run_stats.update(check_stats)
         self.active_run_stats["groups_found"] = check_stats.get("groups_found", 0)
@@ -270,6 +321,9 @@ class DuplicateWindow(QWidget):
             self.log_performance_if_finished()
 
     def reactivate_ui_after_check(self):
+        # Progress updates still queued for the UI are outdated once the check has ended
+        self._pending_progress = None
+        self._pending_download_progress = None
         self.set_button_state(self.settings_panel.btn_folder, 'toned_down')
         if self.folder_path:
             self.set_button_state(self.settings_panel.btn_start, 'highlight')
@@ -301,17 +355,25 @@ class DuplicateWindow(QWidget):
             return
 
         active_group_paths = self.all_groups[self.current_group_index]
-        
-        dialog = ReviewDialog(self.all_file_data, self.STYLES, self)
+
+        # review_group() blocks until the dialog closes, so the prefetch has to start first
+        self.prefetch_group_previews(self.current_group_index + 1)
+
+        dialog = ReviewDialog(self.all_file_data, self.STYLES, self, self.preview_cache)
         dialog.group_approved.connect(self.handle_group_approved)
         dialog.group_skipped.connect(self.handle_group_skipped)
         dialog.review_group(active_group_paths, self.current_group_index, len(self.all_groups))
 
+    def prefetch_group_previews(self, group_index):
+        """Starts decoding the thumbnails of a group in the background."""
+        if not (0 <= group_index < len(self.all_groups)):
+            return
+        paths = [path for path in self.all_groups[group_index] if path in self.all_file_data]
+        self.preview_cache.prefetch(paths, get_thumbnail_size(len(paths)))
+
     def handle_group_approved(self, path_to_keep):
         active_group = self.all_groups[self.current_group_index]
-        for file_path in active_group:
-            if file_path != path_to_keep:
-                self.match_engine.add_file_for_removal(file_path)
+        self.match_engine.add_files_for_removal(path for path in active_group if path != path_to_keep)
         logging.info(f"GROUP {self.current_group_index + 1}: Keeping '{os.path.basename(path_to_keep)}'")
         self.current_group_index += 1
         self.process_next_group()
@@ -336,25 +398,20 @@ class DuplicateWindow(QWidget):
             'files_for_removal': self.files_for_removal,
             'files_to_sort': self.files_to_sort,
             'remains_action': 'recycle' if 'Recycle' in remains_action_text else 'move',
-            'duplicates_folder': os.path.join(TARGET_BASE_DIR, DUPLICATES_FOLDER_NAME),
+            'duplicates_folder': DUPLICATES_FOLDER,
             'source_folder': self.folder_path,
+            'source_device': self.source_device,
             'enable_sorting': self.settings_panel.sort_files_checkbox.isChecked()
         }
 
         self.set_button_state(self.status_panel.btn_process_duplicates, 'disabled')
         logging.info(f"Starting file actions with config: {action_config}")
         
-        self.action_thread = QThread()
         self.action_worker = ActionWorker(action_config)
-        self.action_worker.moveToThread(self.action_thread)
-        self.action_worker.progress_log.connect(self.append_log_message)
-        self.action_worker.finished.connect(self.handle_actions_finished)
-        
-        self.action_thread.started.connect(self.action_worker.run)
-        self.action_thread.finished.connect(self.action_thread.quit)
-        self.action_thread.finished.connect(self.action_thread.deleteLater)
-        self.action_thread.finished.connect(lambda: setattr(self, 'action_thread', None))
-        self.action_thread.start()
+        self.action_worker.signals.progress_log.connect(self.append_log_message)
+        self.action_worker.signals.finished.connect(self.handle_actions_finished)
+
+        self.thread_pool.start(self.action_worker)
 
     # --- NEW: Renamed and updated to handle results from ActionWorker ---
     def handle_actions_finished(self, action_stats):
@@ -389,17 +446,13 @@ class DuplicateWindow(QWidget):
 
     def closeEvent(self, event):
         logging.info("Application is closing.")
-        if self.check_thread and self.check_thread.isRunning():
-            self.check_thread.quit()
-            self.check_thread.wait()
-        if self.action_thread and self.action_thread.isRunning():
-            self.action_thread.quit()
-            self.action_thread.wait()
+        # Let a running check or file action finish before the window goes away
+        self.thread_pool.waitForDone()
         event.accept()
 
     def handle_progress_updated(self, value, text):
-        self.status_panel.progress_bar.setValue(value)
-        self.status_panel.status.setText(text)
+        self._pending_progress = (value, text)
+        self._schedule_progress_flush()
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
@@ -5,14 +5,39 @@ import os
 import logging
 import ctypes
 import time
+import queue
+import threading
+import itertools
 from collections import Counter
 # --- NEW: Added ThreadPoolExecutor for parallel downloads ---
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import ALLOWED_IMAGE_EXTENSIONS
 
 # Windows file attribute constant for files that are not fully present locally
 FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS = 0x00400000
 
+# Win32 / Cloud Files API constants used to hydrate placeholders
+FILE_SHARE_READ = 0x00000001
+OPEN_EXISTING = 3
+FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+CF_HYDRATE_FLAG_NONE = 0
+
+# On Windows, os.scandir already fetches the file attributes, so DirEntry.stat()
+# is free and exposes st_file_attributes.
+CAN_READ_SCAN_ATTRIBUTES = os.name == 'nt'
+
+# Upper bound on the number of threads walking subdirectories in parallel
+SCAN_MAX_WORKERS = 8
+# Number of directory entries categorized and handed on per batch while scanning
+SCAN_BATCH_SIZE = 256
+# Maximum number of categorized batches waiting for the consumer; the walkers pause when it is full
+SCAN_QUEUE_MAX_SIZE = 1024
+# Put on the scan results queue once all walkers have finished
+_SCAN_DONE = object()
+# Number of parallel downloads. These are pure I/O waits against the cloud provider.
+DOWNLOAD_MAX_WORKERS = 12
+
 def is_online_only(file_path):
     """
     Checks if a file is a placeholder (e.g., OneDrive "online-only" file).
@@ -23,75 +48,408 @@ def is_online_only(file_path):
             return False
         return (attrs & FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS) != 0
     except Exception as e:
-        logging.warning(f"Could not check file attributes for {file_path}: {e}")
+        logging.warning("Could not check file attributes for %s: %s", file_path, e)
         return False
 
+def _find_cloud_sync_roots():
+    """
+    Returns the root folders of known cloud sync clients (OneDrive, iCloud, Dropbox)
+    that exist on this machine. Only files below these can be online-only.
+    """
+    home = os.path.expanduser("~")
+    roots = [os.environ.get(name) for name in ("OneDrive", "OneDriveConsumer", "OneDriveCommercial")]
+    roots += [os.path.join(home, name) for name in ("iCloudDrive", "Dropbox")]
+    return [os.path.normcase(os.path.abspath(root)) for root in roots if root and os.path.isdir(root)]
+
+def may_need_download(folder_path):
+    """
+    Checks whether a folder is inside, or contains, a cloud sync folder, i.e. whether
+    any of its files can be online-only and might have to be downloaded first.
+    """
+    folder = os.path.normcase(os.path.abspath(folder_path))
+    for root in _find_cloud_sync_roots():
+        try:
+            common_path = os.path.commonpath([folder, root])
+        except ValueError:
+            # On different drives
+            continue
+        if common_path in (folder, root):
+            return True
+    return False
+
+def _record_dir_mtime(entry, dir_mtimes):
+    """
+    Records a directory's mtime_ns from its DirEntry, taken before the directory is
+    listed, so a file added or removed while it is scanned still shows up as a change.
+    None marks a directory whose changes cannot be detected.
+    """
+    try:
+        dir_mtimes[entry.path] = entry.stat().st_mtime_ns
+    except OSError:
+        dir_mtimes[entry.path] = None
+
+def _walk(folder_path, dir_mtimes):
+    """
+    Walks a directory tree with an explicit stack of os.scandir iterators,
+    yielding the DirEntry for every file. Avoids the extra stat and path
+    join per entry that os.walk performs. The mtime_ns of every subdirectory
+    found is recorded in dir_mtimes.
+    """
+    stack = [folder_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        # Like os.walk, symlinked directories are not followed
+                        if not entry.is_symlink():
+                            _record_dir_mtime(entry, dir_mtimes)
+                            stack.append(entry.path)
+                    else:
+                        yield entry
+        except OSError as e:
+            dir_mtimes[directory] = None
+            logging.warning("Could not read directory: %s", e)
+
+def _categorize_files(entries):
+    """
+    Counts file entries by extension and collects the image paths, along with
+    their (size, mtime_ns) so later steps do not need to stat them again.
+    Returns (total_files, image_files, other_files, candidate_image_paths, candidate_stats, online_paths).
+    """
+    image_extensions = []
+    other_extensions = []
+    candidate_image_paths = []
+    candidate_stats = {}
+    online_paths = []
+    # Local bindings keep attribute lookups out of the per-file loop
+    allowed_extensions = ALLOWED_IMAGE_EXTENSIONS
+    append_image_extension = image_extensions.append
+    append_other_extension = other_extensions.append
+    append_candidate = candidate_image_paths.append
+    append_online = online_paths.append
+    check_attributes = CAN_READ_SCAN_ATTRIBUTES
+    for entry in entries:
+        head, _, tail = entry.name.rpartition('.')
+        ext = '.' + tail.lower() if head else ".NO_EXT"
+        if ext in allowed_extensions:
+            append_image_extension(ext)
+            path = entry.path
+            append_candidate(path)
+            try:
+                # Free on Windows, where os.scandir already returned the stat data
+                stat_info = entry.stat()
+            except OSError as e:
+                logging.warning("Could not read file information for %s: %s", path, e)
+                continue
+            candidate_stats[path] = (stat_info.st_size, stat_info.st_mtime_ns)
+            if check_attributes and stat_info.st_file_attributes & FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS:
+                append_online(path)
+        else:
+            append_other_extension(ext)
+    # Counter's constructor counts the whole list in a single C-level pass
+    total_files = len(image_extensions) + len(other_extensions)
+    return (total_files, Counter(image_extensions), Counter(other_extensions),
+            candidate_image_paths, candidate_stats, online_paths)
+
+def put_unless_stopped(items, item, stop):
+    """
+    Puts an item on a bounded queue, waiting while it is full. Gives up once stop is
+    set, so producers never block forever on a consumer that has gone away.
+    Returns False if the item was not put.
+    """
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _categorize_in_batches(entries, results, stop):
+    """
+    Categorizes file entries in chunks of SCAN_BATCH_SIZE and puts each result on
+    the results queue as soon as it is ready, instead of waiting for the whole tree.
+    """
+    entries = iter(entries)
+    while True:
+        chunk = list(itertools.islice(entries, SCAN_BATCH_SIZE))
+        if not chunk or not put_unless_stopped(results, _categorize_files(chunk), stop):
+            return
+
+def _walk_subtree(folder_path, results, stop, dir_mtimes):
+    """Walks and categorizes a single subtree. Runs on a scan worker thread."""
+    _categorize_in_batches(_walk(folder_path, dir_mtimes), results, stop)
+
+def _scan_into_queue(folder_path, results, stop, dir_mtimes):
+    """
+    Runs the whole scan on a background thread. The immediate subdirectories are
+    walked in parallel, since directory enumeration is I/O-bound (especially on
+    cloud-synced folders). Puts categorized batches on the results queue, followed
+    by _SCAN_DONE, or by the exception that stopped the scan. Stops early once
+    stop is set. The mtime_ns of every directory visited is recorded in dir_mtimes.
+    """
+    try:
+        top_level_files = []
+        subdirectories = []
+        try:
+            dir_mtimes[folder_path] = os.stat(folder_path).st_mtime_ns
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            _record_dir_mtime(entry, dir_mtimes)
+                            subdirectories.append(entry.path)
+                    else:
+                        top_level_files.append(entry)
+        except OSError as e:
+            dir_mtimes[folder_path] = None
+            logging.warning("Could not read directory: %s", e)
+
+        if subdirectories:
+            # Capped to avoid thrashing spinning disks with too many concurrent walkers
+            max_workers = min(SCAN_MAX_WORKERS, (os.cpu_count() or 1) * 2, len(subdirectories))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_walk_subtree, path, results, stop, dir_mtimes) for path in subdirectories]
+                _categorize_in_batches(top_level_files, results, stop)
+                for future in futures:
+                    future.result()
+        else:
+            _categorize_in_batches(top_level_files, results, stop)
+    except Exception as e:
+        put_unless_stopped(results, e, stop)
+    else:
+        put_unless_stopped(results, _SCAN_DONE, stop)
+
+def iter_scan_directory(folder_path, scan_summary):
+    """
+    Starts scanning a directory recursively like scan_directory, and returns an
+    iterator of batches found while the scan is still running, so later steps can
+    start on the first images. Each batch is a tuple (candidate_paths, online_paths);
+    online_paths is None if the attributes could not be read during the scan.
+    scan_summary is set up right away and filled with the running counts as the
+    batches are consumed; "scan_complete" is set once the whole folder has been scanned.
+    "needs_download" is known right away: if it is False, no file can be online-only,
+    and every batch's online_paths is empty. When the scan reads the file attributes,
+    it starts out True and is set from the online paths found once the scan is complete.
+    """
+    start_time = time.monotonic()
+    logging.info("Starting scan of folder: %s", folder_path)
+    # The path heuristic is only needed when the scan cannot see which files are online-only,
+    # since synced folders can also live outside the known cloud sync roots
+    needs_download = True if CAN_READ_SCAN_ATTRIBUTES else may_need_download(folder_path)
+    try:
+        # DirEntry.stat() leaves st_dev at 0 on Windows, so the folder itself is stat'ed once
+        source_device = os.stat(folder_path).st_dev
+    except OSError:
+        source_device = None
+
+    scan_summary.update({
+        "total_files": 0, "image_files": Counter(),
+        "other_files": Counter(), "candidate_paths": [],
+        # Maps each candidate path to (size, mtime_ns)
+        "candidate_stats": {},
+        # None means the attributes could not be read during the scan
+        "online_paths": [] if CAN_READ_SCAN_ATTRIBUTES else None,
+        "needs_download": needs_download,
+        # Maps every directory visited to its mtime_ns (None if unreadable), set once the scan is complete
+        "dir_mtimes": None,
+        # Device of the scanned folder, or None if unknown
+        "source_device": source_device,
+        "scan_duration": 0, "scan_complete": False
+    })
+
+    # The walkers hand their results to the consuming thread, so scan_summary
+    # is only ever modified there
+    results = queue.Queue(maxsize=SCAN_QUEUE_MAX_SIZE)
+    stop = threading.Event()
+    # Only filled by the walkers, and handed to scan_summary once they have all finished
+    dir_mtimes = {}
+    scanner = threading.Thread(target=_scan_into_queue, args=(folder_path, results, stop, dir_mtimes),
+                               name="FolderScanner", daemon=True)
+    scanner.start()
+    return _iter_scan_results(results, stop, scan_summary, start_time, dir_mtimes)
+
+def _iter_scan_results(results, stop, scan_summary, start_time, dir_mtimes):
+    """
+    Merges the scan results into scan_summary as they arrive, yielding each batch.
+    If the consumer stops early, the scan is stopped as well.
+    """
+    image_files = scan_summary["image_files"]
+    other_files = scan_summary["other_files"]
+    candidate_image_paths = scan_summary["candidate_paths"]
+    candidate_stats = scan_summary["candidate_stats"]
+    # Without scan attributes, no online paths are found during the scan
+    online_paths = scan_summary["online_paths"] if CAN_READ_SCAN_ATTRIBUTES else []
+    # Outside of cloud sync folders nothing has to be checked per file
+    batch_online_paths_unknown = not CAN_READ_SCAN_ATTRIBUTES and scan_summary["needs_download"]
+    try:
+        while True:
+            item = results.get()
+            if item is _SCAN_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            sub_total, sub_images, sub_others, sub_paths, sub_stats, sub_online = item
+            scan_summary["total_files"] += sub_total
+            image_files.update(sub_images)
+            other_files.update(sub_others)
+            candidate_image_paths.extend(sub_paths)
+            candidate_stats.update(sub_stats)
+            online_paths.extend(sub_online)
+            if sub_paths:
+                yield sub_paths, None if batch_online_paths_unknown else sub_online
+    finally:
+        stop.set()
+
+    scan_summary["image_files"] = dict(image_files)
+    scan_summary["other_files"] = dict(other_files)
+    if CAN_READ_SCAN_ATTRIBUTES:
+        scan_summary["needs_download"] = bool(online_paths)
+    scan_summary["dir_mtimes"] = dir_mtimes
+    scan_summary["scan_duration"] = time.monotonic() - start_time
+    scan_summary["scan_complete"] = True
+    logging.info("Folder scan completed in %.2f seconds.", scan_summary['scan_duration'])
+
 def scan_directory(folder_path):
     """
     Scans a directory recursively to find all files, categorizing them
     into images and others based on extensions.
     """
-    start_time = time.monotonic()
-    image_files = Counter()
-    other_files = Counter()
-    candidate_image_paths = []
-    total_files = 0
-    logging.info(f"Starting scan of folder: {folder_path}")
-    for root, _, files in os.walk(folder_path):
-        for filename in files:
-            total_files += 1
-            ext = os.path.splitext(filename)[1].lower()
-            if not ext:
-                ext = ".NO_EXT"
-            if ext in ALLOWED_IMAGE_EXTENSIONS:
-                image_files[ext] += 1
-                candidate_image_paths.append(os.path.join(root, filename))
-            else:
-                other_files[ext] += 1
-    scan_duration = time.monotonic() - start_time
-    logging.info(f"Folder scan completed in {scan_duration:.2f} seconds.")
-    return {
-        "total_files": total_files, "image_files": dict(image_files),
-        "other_files": dict(other_files), "candidate_paths": candidate_image_paths,
-        "scan_duration": scan_duration
-    }
+    scan_summary = {}
+    for _ in iter_scan_directory(folder_path, scan_summary):
+        pass
+    return scan_summary
+
+def _load_cloud_files_api():
+    """
+    Loads kernel32 and the Windows Cloud Files API (cldapi.dll).
+    Returns (kernel32, cldapi), or None if they are not available on this system.
+    """
+    try:
+        from ctypes import wintypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        cldapi = ctypes.WinDLL("cldapi")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+    kernel32.CreateFileW.argtypes = [
+        wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+        wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE
+    ]
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    kernel32.CloseHandle.restype = wintypes.BOOL
+    # HRESULT CfHydratePlaceholder(HANDLE, LARGE_INTEGER, LARGE_INTEGER, CF_HYDRATE_FLAGS, LPOVERLAPPED)
+    cldapi.CfHydratePlaceholder.argtypes = [
+        wintypes.HANDLE, ctypes.c_longlong, ctypes.c_longlong, ctypes.c_int, wintypes.LPVOID
+    ]
+    cldapi.CfHydratePlaceholder.restype = ctypes.c_long
+    return kernel32, cldapi
+
+_CLOUD_FILES_API = _load_cloud_files_api()
+
+def _hydrate_placeholder(path):
+    """
+    Asks the cloud provider to hydrate the whole file via CfHydratePlaceholder,
+    without reading any data into Python. Returns True on success.
+    """
+    if _CLOUD_FILES_API is None:
+        return False
+    kernel32, cldapi = _CLOUD_FILES_API
+    handle = kernel32.CreateFileW(
+        str(path), 0, FILE_SHARE_READ, None, OPEN_EXISTING, FILE_FLAG_BACKUP_SEMANTICS, None
+    )
+    if handle is None or handle == INVALID_HANDLE_VALUE:
+        return False
+    try:
+        # Offset 0 and length -1 hydrate the entire file
+        return cldapi.CfHydratePlaceholder(handle, 0, -1, CF_HYDRATE_FLAG_NONE, None) == 0
+    finally:
+        kernel32.CloseHandle(handle)
 
 def _trigger_download(path):
-    """Reads the first byte of a file to trigger its download from the cloud."""
+    """
+    Triggers the download of a file from the cloud. Uses the Cloud Files API when
+    available, and otherwise falls back to reading the first byte of the file.
+    """
     try:
-        with open(path, 'rb') as f:
-            f.read(1)
-        logging.info(f"Download complete for: {os.path.basename(path)}")
+        if not _hydrate_placeholder(path):
+            with open(path, 'rb') as f:
+                f.read(1)
+        logging.info("Download complete for: %s", os.path.basename(path))
         return True
     except Exception as e:
-        logging.error(f"Could not download the file {os.path.basename(path)}: {e}")
+        logging.error("Could not download the file %s: %s", os.path.basename(path), e)
         return False
 
-def ensure_files_are_local(file_paths, progress_callback):
+def iter_batches_as_local(path_batches, progress_callback):
     """
-    Checks a list of files and triggers downloads in parallel for any that are online-only.
+    Takes an iterable of (paths, online_paths) batches and yields lists of paths as
+    soon as the files are available locally: the local files of each batch right
+    away, and each online-only file as its download completes. Downloads run in
+    parallel while the next batches arrive. If online_paths is None, each file is checked.
     """
     start_time = time.monotonic()
-    online_files = [path for path in file_paths if is_online_only(path)]
-    
-    if not online_files:
-        logging.info("All files are already available locally.")
-        return 0.0
-        
-    total_to_download = len(online_files)
-    logging.info(f"Found {total_to_download} files that need to be downloaded from the cloud.")
-    
-    # --- NEW: Using ThreadPoolExecutor for parallel downloads ---
+    total_to_download = 0
     completed_count = 0
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        # Submit all download tasks
-        futures = {executor.submit(_trigger_download, path): path for path in online_files}
-        
-        for future in futures:
-            future.result()  # Wait for the download to complete
+
+    # --- NEW: Using ThreadPoolExecutor for parallel downloads ---
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_WORKERS) as executor:
+        futures = {}
+
+        def collect(future):
+            nonlocal completed_count
+            future.result()
             completed_count += 1
             progress_callback(completed_count, total_to_download)
-            
+            return [futures.pop(future)]
+
+        for paths, online_files in path_batches:
+            if online_files is None:
+                online_files = [path for path in paths if is_online_only(path)]
+            if online_files:
+                online_set = set(online_files)
+                local_files = [path for path in paths if path not in online_set]
+                total_to_download += len(online_files)
+                for path in online_files:
+                    futures[executor.submit(_trigger_download, path)] = path
+            else:
+                local_files = paths
+
+            if local_files:
+                yield local_files
+
+            # Hand over downloads that finished while this batch was processed
+            for future in [future for future in futures if future.done()]:
+                yield collect(future)
+
+        # Report progress in completion order, so a slow file doesn't hold back the rest
+        for future in as_completed(list(futures)):
+            yield collect(future)
+
+    if not total_to_download:
+        logging.info("All files are already available locally.")
+        return
     download_duration = time.monotonic() - start_time
-    logging.info(f"Download of {total_to_download} files completed in {download_duration:.2f} seconds.")
-    return download_duration
+    logging.info("Download of %s files completed in %.2f seconds.", total_to_download, download_duration)
+
+def iter_files_as_local(file_paths, progress_callback, online_files=None):
+    """
+    Yields lists of paths as soon as the files are available locally: first all
+    files that are already local, then each online-only file as its download completes.
+    If online_files is given (e.g. from scan_directory), the per-file check is skipped.
+    """
+    yield from iter_batches_as_local([(file_paths, online_files)], progress_callback)
+
+def ensure_files_are_local(file_paths, progress_callback, online_files=None):
+    """
+    Checks a list of files and triggers downloads in parallel for any that are online-only.
+    If online_files is given (e.g. from scan_directory), the per-file check is skipped.
+    Returns the time spent, in seconds.
+    """
+    start_time = time.monotonic()
+    for _ in iter_files_as_local(file_paths, progress_callback, online_files):
+        pass
+    return time.monotonic() - start_time
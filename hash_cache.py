@@ -0,0 +1,87 @@
+# hash_cache.py
+# Persistent cache of image hashes, so unchanged files are not decoded again on later runs.
+
+import os
+import logging
+import sqlite3
+
+from config import HASH_CACHE_PATH
+
+# Number of new rows written to the database per transaction
+INSERT_BATCH_SIZE = 1000
+
+class HashCache:
+    """
+    A sqlite-backed cache mapping (path, size, mtime_ns) to the dhash and resolution
+    of an image. A file is only a cache hit if its size and modification time are unchanged.
+    If the database cannot be opened, the cache is simply disabled.
+    """
+    def __init__(self, db_path=HASH_CACHE_PATH):
+        self.connection = None
+        self._pending_rows = []
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.connection = sqlite3.connect(db_path)
+            # WAL keeps reads fast while new hashes are being written
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS h ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, dhash BLOB, resolution INTEGER)"
+            )
+        except (OSError, sqlite3.Error) as e:
+            logging.warning("Hash cache is unavailable, all images will be hashed: %s", e)
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, path, size, mtime_ns):
+        """Returns (hash, resolution) for an unchanged file, or None if it is not cached."""
+        if self.connection is None:
+            return None
+        try:
+            row = self.connection.execute(
+                "SELECT dhash, resolution FROM h WHERE path=? AND size=? AND mtime_ns=?",
+                (path, size, mtime_ns)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning("Could not read from hash cache: %s", e)
+            return None
+        if row is None:
+            return None
+        return int.from_bytes(row[0], "big"), row[1]
+
+    def add(self, path, size, mtime_ns, hash_value, resolution):
+        """Queues a new hash to be stored. Rows are written in batches."""
+        if self.connection is None:
+            return
+        # Stored as 8 big-endian bytes, since sqlite integers are signed 64-bit
+        self._pending_rows.append((path, size, mtime_ns, hash_value.to_bytes(8, "big"), resolution))
+        if len(self._pending_rows) >= INSERT_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Writes all queued rows in a single transaction, replacing outdated entries."""
+        if self.connection is None or not self._pending_rows:
+            return
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO h (path, size, mtime_ns, dhash, resolution) VALUES (?, ?, ?, ?, ?)",
+                    self._pending_rows
+                )
+        except sqlite3.Error as e:
+            logging.warning("Could not write to hash cache: %s", e)
+        self._pending_rows.clear()
+
+    def close(self):
+        """Writes any queued rows and closes the database."""
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
@@ -2,37 +2,105 @@
 
 import os
 import logging
+import threading
+from collections import OrderedDict
 from PySide6.QtWidgets import QLabel, QGridLayout, QWidget, QVBoxLayout
-from PySide6.QtGui import QPixmap
-from PySide6.QtCore import Qt, QPoint, Signal
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import Qt, QPoint, QRunnable, QThreadPool, Signal
 from PIL import Image
 from PIL.ImageQt import ImageQt
 
 from data_models import FileMetadata
 
-def create_pixmap_from_path(path, size):
+# Maximum number of prefetched thumbnails kept in memory
+PREVIEW_CACHE_SIZE = 32
+
+def load_thumbnail_image(path, size):
+    """
+    Decodes an image into a QImage scaled to fit a size x size box.
+    Unlike QPixmap, QImage may be used outside the GUI thread, so this can run in the background.
+    Returns a null QImage if the file cannot be loaded.
+    """
+    image = QImage(path)
+    if image.isNull():
+        # Fallback to Pillow if Qt fails (typically for DNG/RAW)
+        try:
+            with Image.open(path) as img:
+                if img.mode != 'RGBA':
+                    img = img.convert('RGBA')
+                # Copy so the QImage no longer depends on Pillow's buffer
+                image = ImageQt(img).copy()
+        except Exception as e:
+            logging.warning(f"Could not load preview for {os.path.basename(path)} with Pillow: {e}")
+            return QImage()
+    return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class _PreviewLoader(QRunnable):
+    """Background task that decodes one thumbnail into a PreviewCache."""
+    def __init__(self, cache, path, size):
+        super().__init__()
+        self.cache = cache
+        self.path = path
+        self.size = size
+
+    def run(self):
+        image = load_thumbnail_image(self.path, self.size)
+        if not image.isNull():
+            self.cache.put(self.path, self.size, image)
+
+
+class PreviewCache:
+    """
+    A bounded, thread-safe LRU cache of decoded thumbnails, keyed by (path, size).
+    Filled in the background with prefetch(), so the next review group can be shown
+    without decoding its images on the GUI thread.
+    """
+    def __init__(self, max_size=PREVIEW_CACHE_SIZE):
+        self.max_size = max_size
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, size):
+        """Returns the cached QImage, or None if it has not been loaded."""
+        with self._lock:
+            image = self._images.get((path, size))
+            if image is not None:
+                self._images.move_to_end((path, size))
+            return image
+
+    def put(self, path, size, image):
+        with self._lock:
+            self._images[(path, size)] = image
+            self._images.move_to_end((path, size))
+            while len(self._images) > self.max_size:
+                self._images.popitem(last=False)
+
+    def prefetch(self, paths, size):
+        """Starts decoding the given images on the shared thread pool."""
+        pool = QThreadPool.globalInstance()
+        for path in paths:
+            if self.get(path, size) is None:
+                pool.start(_PreviewLoader(self, path, size))
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+def create_pixmap_from_path(path, size, preview_cache=None):
     """
     A robust function for creating a QPixmap.
-    Tries Qt directly first, then Pillow as a fallback for complex formats.
+    Uses a prefetched thumbnail if available, otherwise decodes the image with
+    load_thumbnail_image (Qt first, then Pillow as a fallback for complex formats).
     """
-    pixmap = QPixmap(path)
-    if not pixmap.isNull():
-        return pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-
-    # Fallback to Pillow if QPixmap fails (typically for DNG/RAW)
-    try:
-        with Image.open(path) as img:
-            # Converts to RGBA for best compatibility
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-
-            qimage = ImageQt(img)
-            pixmap = QPixmap.fromImage(qimage)
-            return pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-    except Exception as e:
-        logging.warning(f"Could not load preview for {os.path.basename(path)} with Pillow: {e}")
-        # Returns an empty pixmap if everything fails
-        return QPixmap()
+    if preview_cache is not None:
+        cached_image = preview_cache.get(path, size)
+        if cached_image is not None:
+            return QPixmap.fromImage(cached_image)
+
+    # Returns an empty pixmap if everything fails
+    return QPixmap.fromImage(load_thumbnail_image(path, size))
 
 
 class HoverLabel(QLabel):
@@ -85,7 +153,7 @@ class ImageInfoWidget(QWidget):
     """A widget that displays an image (HoverLabel) and text with metadata."""
     clicked = Signal(str)
 
-    def __init__(self, metadata: FileMetadata, styles, thumbnail_size=140, parent=None):
+    def __init__(self, metadata: FileMetadata, styles, thumbnail_size=140, parent=None, preview_cache=None):
         super().__init__(parent)
         self.file_path = metadata.path
         self.styles = styles
@@ -97,7 +165,7 @@ class ImageInfoWidget(QWidget):
         self.image_label = HoverLabel()
         self.image_label.set_file_path(metadata.path)
         
-        pix = create_pixmap_from_path(metadata.path, thumbnail_size)
+        pix = create_pixmap_from_path(metadata.path, thumbnail_size, preview_cache)
         self.image_label.setPixmap(pix)
         # Set size based on the thumbnail, adding a little extra for the border
         self.image_label.setFixedSize(thumbnail_size + 10, thumbnail_size + 10)
@@ -143,7 +211,17 @@ class ImageInfoWidget(QWidget):
         self.setStyleSheet(f"QWidget {{ {self.styles[style_key]} }}")
 
 
-def display_group(group_metadata_list, container_widget, click_handler, styles):
+def get_thumbnail_size(num_images):
+    """Determines the thumbnail size based on the number of images in a group."""
+    if num_images > 10:
+        return 80  # Smallest size for very large groups
+    elif num_images > 5:
+        return 110 # Medium size for medium groups
+    else:
+        return 140 # Largest size for small groups
+
+
+def display_group(group_metadata_list, container_widget, click_handler, styles, preview_cache=None):
     """Displays all images in a duplicate group with metadata in a grid."""
     layout = container_widget.layout()
 
@@ -154,13 +232,7 @@ def display_group(group_metadata_list, container_widget, click_handler, styles):
             child.widget().deleteLater()
 
     # Determine thumbnail size based on the number of images
-    num_images = len(group_metadata_list)
-    if num_images > 10:
-        thumbnail_size = 80  # Smallest size for very large groups
-    elif num_images > 5:
-        thumbnail_size = 110 # Medium size for medium groups
-    else:
-        thumbnail_size = 140 # Largest size for small groups
+    thumbnail_size = get_thumbnail_size(len(group_metadata_list))
 
     # Estimate the horizontal space one item takes up (thumbnail + padding)
     item_width_estimate = thumbnail_size + 20
@@ -180,7 +252,7 @@ def display_group(group_metadata_list, container_widget, click_handler, styles):
     col = 0
 
     for metadata in group_metadata_list:
-        info_widget = ImageInfoWidget(metadata, styles, thumbnail_size)
+        info_widget = ImageInfoWidget(metadata, styles, thumbnail_size, preview_cache=preview_cache)
         info_widget.clicked.connect(click_handler)
 
         layout.addWidget(info_widget, row, col)
@@ -1,6 +1,9 @@
 # logger_setup.py
 import logging
+import logging.handlers
 import sys
+import queue
+import atexit
 from pathlib import Path
 from config import LOG_FOLDER, LOG_FILENAME
 
@@ -18,11 +21,28 @@ class QTextEditLogger(logging.Handler):
         msg = self.format(record)
         self.widget.append(msg)
 
+# Writes the queued log records to the file and console on a background thread
+_queue_listener = None
+
+def _stop_queue_listener():
+    """Writes out any queued log records, stops the listener thread and closes its handlers."""
+    global _queue_listener
+    if _queue_listener:
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.close()
+        _queue_listener = None
+
+# Registered once, however often the logger is set up again
+atexit.register(_stop_queue_listener)
+
 def setup_global_logger(gui_log_handler=None):
     """
     Configures a global logger that writes to both a file and, if available,
-    a GUI element.
+    a GUI element. File and console output is written on a background thread,
+    so logging from worker threads never waits for disk or console I/O.
     """
+    global _queue_listener
     log_path = Path(LOG_FOLDER) / LOG_FILENAME
     # Added 'parents=True' to ensure the entire folder structure is created.
     log_path.parent.mkdir(parents=True, exist_ok=True)
@@ -44,18 +64,27 @@ def setup_global_logger(gui_log_handler=None):
 
     if logger.hasHandlers():
         logger.handlers.clear()
+    _stop_queue_listener()
 
     # File handler
     file_handler = logging.FileHandler(str(log_path), encoding='utf-8')
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
 
     # Console handler (for debugging)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.DEBUG)
-    logger.addHandler(console_handler)
 
+    # The calling thread only merges the message with its arguments and queues the record;
+    # the listener thread applies the formatter and writes it to the file and console
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+
+    # The GUI handler stays synchronous, so messages appear in order with other UI updates
     if gui_log_handler:
         gui_log_handler.setFormatter(formatter)
         gui_log_handler.setLevel(logging.INFO)
@@ -12,6 +12,10 @@ class MatchEngine:
         """Adds a file to the list of files to be removed."""
         self.files_for_removal.add(file_path)
 
+    def add_files_for_removal(self, file_paths):
+        """Adds several files to the list of files to be removed in one call."""
+        self.files_for_removal.update(file_paths)
+
     def get_files_for_removal(self):
         """Returns the final list of files to be removed."""
         return list(self.files_for_removal)
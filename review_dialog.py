@@ -20,17 +20,19 @@ class ReviewDialog(QDialog):
     # Signal emitted when the user decides to skip the current group.
     group_skipped = Signal()
 
-    def __init__(self, all_file_data, styles, parent=None):
+    def __init__(self, all_file_data, styles, parent=None, preview_cache=None):
         """
         Initializes the dialog window.
         Args:
             all_file_data (dict): A dictionary mapping file paths to their metadata.
             styles (dict): A dictionary of stylesheet fragments for styling widgets.
             parent (QWidget): The parent widget, typically the main application window.
+            preview_cache (PreviewCache): Optional cache of prefetched thumbnails.
         """
         super().__init__(parent)
         self.all_file_data = all_file_data
         self.styles = styles
+        self.preview_cache = preview_cache
         self.selected_image_in_group = None
 
         # --- Basic Dialog Setup ---
@@ -111,7 +113,7 @@ class ReviewDialog(QDialog):
         group_metadata = [self.all_file_data[path] for path in group_paths if path in self.all_file_data]
 
         # Use the existing display_group function to populate the grid.
-        display_group(group_metadata, self.grid_container, self.on_thumbnail_clicked, self.styles)
+        display_group(group_metadata, self.grid_container, self.on_thumbnail_clicked, self.styles, self.preview_cache)
 
         # Show the dialog modally, which pauses the main window until this one is closed.
         self.exec()
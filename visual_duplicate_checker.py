@@ -5,56 +5,256 @@ import os
 import logging
 import time
 import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import imagehash
+import numpy as np
 import pyvips
 from PIL import Image
-import pybktree
 
 from data_models import FileMetadata
-from group_match_engine import GroupMatchEngine
+from hash_cache import HashCache
 from config import MIN_SIZE_BYTES
 
-def _hash_file_standalone(file_path):
+# Maximum number of images hashed together in one worker task
+HASH_BATCH_SIZE = 64
+# ProcessPoolExecutor does not support more workers than this on Windows
+MAX_HASH_WORKERS = 61
+# dhash compares hash_size + 1 columns per row, giving hash_size * hash_size bits
+DHASH_SIZE = 8
+# Number of hashes per side of each block in the pairwise Hamming distance search
+HAMMING_TILE_SIZE = 1024
+
+if hasattr(np, "bitwise_count"):
+    # NumPy >= 2.0 maps this to the CPU's native popcount instruction
+    _popcount64 = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount64(values):
+        """Counts the set bits of each uint64 using a per-byte lookup table."""
+        counts = _POPCOUNT_TABLE[values.view(np.uint8)]
+        return counts.reshape(values.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+def _init_hash_worker():
     """
-    Validates and hashes a single file. Returns a FileMetadata object or None on error.
+    Prepares a hashing worker process once, instead of on its first image:
+    disables the libvips operation cache (only the image size is read) and
+    registers all PIL image plugins up front.
+    """
+    pyvips.cache_set_max(0)
+    Image.init()
+
+def _load_file_for_hashing(file_path):
+    """
+    Validates a single file and loads what is needed to hash it.
+    Returns (resolution, thumbnail) or None if the file is invalid.
+    Files that are too small have already been skipped before reaching the workers.
     """
     try:
-        # Step 1: Quick validation
-        stat_info = os.stat(file_path)
-        if stat_info.st_size < MIN_SIZE_BYTES:
-            # Ignoring files that are too small
-            return None
-
-        # Step 2: Deeper validation and hashing
-        img = Image.open(file_path)
-        # Checks that the file is not corrupt
-        img.verify()
-
-        img = Image.open(file_path)
-        # CHANGE: Switching to Difference Hash (dhash) for more accurate comparison.
-        img_hash_obj = imagehash.dhash(img)
-
-        # Step 3: Get metadata
+        # Step 1: Deeper validation and loading the dhash thumbnail
+        with Image.open(file_path) as img:
+            # Checks that the file is not corrupt
+            img.verify()
+
+        with Image.open(file_path) as img:
+            # Same grayscale thumbnail as imagehash.dhash, so hash values are unchanged
+            thumbnail = np.asarray(
+                img.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS)
+            )
+
+        # Step 2: Get metadata
         vips_img = pyvips.Image.new_from_file(file_path, access="sequential")
         resolution = vips_img.width * vips_img.height
 
-        hash_as_int = int(str(img_hash_obj), 16)
-
-        return FileMetadata(
-            path=file_path, hash=hash_as_int, resolution=resolution,
-            size=stat_info.st_size, mod_time=stat_info.st_mtime
-        )
+        return resolution, thumbnail
     except Exception as e:
-        logging.warning(f"Could not process the file {os.path.basename(file_path)}: {e}")
+        logging.warning("Could not process the file %s: %s", os.path.basename(file_path), e)
         return None
 
-def batch_duplicate_check(image_paths, threshold, progress_callback):
+def _dhash_batch(thumbnails):
     """
-    Takes a list of validated files, hashes them, finds duplicates, and returns the results.
+    Computes the difference hash of a list of thumbnails in one vectorized operation.
+    Returns the hashes as ints, with the same bit order as imagehash.dhash.
+    """
+    stack = np.stack(thumbnails)
+    bits = stack[:, :, 1:] > stack[:, :, :-1]
+    # packbits is MSB-first, so each row of 8 bytes is the big-endian 64-bit hash
+    packed = np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+    return packed.view(">u8").ravel().tolist()
+
+def _hash_batch_standalone(files):
+    """
+    Validates and hashes a batch of (path, size, mtime_ns) files in a worker process.
+    Returns a list with a FileMetadata object (or None on error) per file, in order.
+    """
+    loaded = [_load_file_for_hashing(path) for path, _, _ in files]
+    valid = [(file, data) for file, data in zip(files, loaded) if data]
+    if not valid:
+        return [None] * len(files)
+
+    hashes = _dhash_batch([thumbnail for _, (_, thumbnail) in valid])
+    metadata_by_path = {
+        path: FileMetadata(
+            path=path, hash=hash_as_int, resolution=resolution,
+            size=size, mod_time=mtime_ns / 1e9
+        )
+        for ((path, size, mtime_ns), (resolution, _)), hash_as_int in zip(valid, hashes)
+    }
+    return [metadata_by_path.get(path) for path, _, _ in files]
+
+def _find_matching_pairs(hashes, threshold, progress_callback):
+    """
+    Finds all pairs of hashes within `threshold` Hamming distance of each other.
+    Compares blocks of hashes with vectorized XOR + popcount, visiting only the
+    upper triangle of the distance matrix. Yields (i, j, dist) index arrays with i < j.
+    """
+    count = len(hashes)
+    total_pairs = count * (count - 1) // 2 or 1
+    for start_i in range(0, count, HAMMING_TILE_SIZE):
+        block_i = hashes[start_i:start_i + HAMMING_TILE_SIZE, None]
+        for start_j in range(start_i, count, HAMMING_TILE_SIZE):
+            block_j = hashes[None, start_j:start_j + HAMMING_TILE_SIZE]
+            distances = _popcount64(block_i ^ block_j)
+            within_threshold = distances <= threshold
+            if start_j == start_i:
+                # Skip the diagonal and the mirrored half of the block
+                within_threshold = np.triu(within_threshold, k=1)
+            i_indices, j_indices = np.nonzero(within_threshold)
+            if len(i_indices):
+                yield i_indices + start_i, j_indices + start_j, distances[i_indices, j_indices]
+
+        rows_done = min(start_i + HAMMING_TILE_SIZE, count)
+        compared_pairs = total_pairs - (count - rows_done) * (count - rows_done - 1) // 2
+        progress_callback(
+            int(80 + 20 * (compared_pairs / total_pairs)),
+            f"Comparing images {rows_done}/{count}..."
+        )
+
+def _connected_components(count, i_indices, j_indices):
+    """
+    Labels the groups of hash indices 0..count-1 connected by the (i, j) pairs, with
+    vectorized label propagation instead of a per-pair union-find in Python. Each
+    index ends up labeled with the smallest index of its group.
+    """
+    labels = np.arange(count)
+    while True:
+        # Hook both ends of every pair onto the smaller label ...
+        pair_labels = np.minimum(labels[i_indices], labels[j_indices])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, i_indices, pair_labels)
+        np.minimum.at(new_labels, j_indices, pair_labels)
+        # ... and shorten label chains by pointer jumping
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+def _split_into_batches(files, num_workers):
+    """Splits files into batches small enough to keep every worker busy."""
+    batch_size = max(1, min(HASH_BATCH_SIZE, -(-len(files) // (num_workers * 4))))
+    return [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+
+def _hash_path_batches(path_batches, total_files, file_stats, progress_callback):
     """
+    Validates and hashes files as their batches arrive, so hashing can start before
+    the last batch is available (e.g. while files are still being downloaded).
+    Files unchanged since an earlier run are taken from the hash cache without decoding.
+    If total_files is None (e.g. while the folder is still being scanned), progress
+    is reported against the number of files received so far, and never moves backwards
+    when a new batch raises that number.
+    Returns (all_file_data, received_count), where all_file_data maps each hashed
+    path to its FileMetadata.
+    """
+    all_file_data = {}
+    received_count = 0
+    processed_count = 0
+    cached_count = 0
+    last_progress_value = 10
+
+    def report_progress():
+        nonlocal last_progress_value
+        expected_count = total_files or received_count
+        progress_value = max(last_progress_value, int(10 + 65 * (processed_count / expected_count)))
+        last_progress_value = progress_value
+        progress_text = f"🔄 Processing image {processed_count} of {expected_count}..."
+        progress_callback(progress_value, progress_text)
+
+    ctx = multiprocessing.get_context("spawn")
+    max_workers = min(os.cpu_count() or 1, MAX_HASH_WORKERS)
+    # Worker processes are only started once the first batch is submitted
+    with HashCache() as hash_cache, ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=ctx, initializer=_init_hash_worker) as executor:
+        pending = {}
+
+        def collect(future):
+            nonlocal processed_count
+            batch = pending.pop(future)
+            for (path, size, mtime_ns), metadata in zip(batch, future.result()):
+                if metadata:
+                    all_file_data[path] = metadata
+                    hash_cache.add(path, size, mtime_ns, metadata.hash, metadata.resolution)
+            processed_count += len(batch)
+            report_progress()
+
+        for paths in path_batches:
+            received_count += len(paths)
+            files_to_hash = []
+            for path in paths:
+                file_stat = file_stats.get(path)
+                if file_stat is None:
+                    try:
+                        stat_info = os.stat(path)
+                    except OSError as e:
+                        logging.warning("Could not process the file %s: %s", os.path.basename(path), e)
+                        continue
+                    file_stat = (stat_info.st_size, stat_info.st_mtime_ns)
+                size, mtime_ns = file_stat
+                if size < MIN_SIZE_BYTES:
+                    # Ignoring files that are too small, using the size already known from the scan
+                    continue
+                cached = hash_cache.get(path, size, mtime_ns)
+                if cached is None:
+                    files_to_hash.append((path, size, mtime_ns))
+                else:
+                    cached_hash, resolution = cached
+                    all_file_data[path] = FileMetadata(
+                        path=path, hash=cached_hash, resolution=resolution,
+                        size=size, mod_time=mtime_ns / 1e9
+                    )
+                    cached_count += 1
+
+            if len(files_to_hash) < len(paths):
+                processed_count += len(paths) - len(files_to_hash)
+                report_progress()
+
+            # Only (path, size, mtime_ns) tuples go to the workers; the results are small FileMetadata objects
+            for batch in _split_into_batches(files_to_hash, max_workers):
+                pending[executor.submit(_hash_batch_standalone, batch)] = batch
+
+            # Pick up finished work while waiting for the next batch
+            for future in [future for future in pending if future.done()]:
+                collect(future)
+
+        for future in as_completed(list(pending)):
+            collect(future)
+
+    if cached_count:
+        logging.info("%s image hashes were loaded from the cache.", cached_count)
+    return all_file_data, received_count
+
+def stream_duplicate_check(path_batches, total_files, threshold, progress_callback, file_stats=None):
+    """
+    Hashes files arriving as an iterable of path batches, finds duplicates, and returns the results.
+    Hashing of each batch starts as soon as it arrives. total_files is the number of
+    paths across all batches, used for progress reporting, or None if it is not known
+    in advance (e.g. while the folder is still being scanned).
+    file_stats optionally maps paths to (size, mtime_ns) from the scan, so the files
+    do not have to be stat'ed again. It may still be filled while batches arrive.
+    """
+    if file_stats is None:
+        file_stats = {}
     stats = {
-        "files_processed": len(image_paths), "failed_files": 0, "images_hashed": 0,
+        "files_processed": total_files or 0, "failed_files": 0, "images_hashed": 0,
         "hashing_time": 0, "comparison_time": 0
     }
     all_file_data = {}
@@ -63,35 +263,27 @@ def batch_duplicate_check(image_paths, threshold, progress_callback):
     try:
         pyvips.cache_set_max(0)
 
-        if not image_paths:
+        if total_files == 0:
             progress_callback(100, "No image files to check.")
             return stats, all_file_data, groups
 
         # Step 1: Validation and Hashing (parallel)
         start_time = time.monotonic()
-
-        ctx = multiprocessing.get_context("spawn")
-        with ctx.Pool(processes=os.cpu_count()) as pool:
-            async_results = [pool.apply_async(_hash_file_standalone, (path,)) for path in image_paths]
-            for i, future in enumerate(async_results):
-                metadata = future.get()
-                if metadata:
-                    all_file_data[metadata.path] = metadata
-
-                processed_count = i + 1
-                progress_value = int(10 + 65 * (processed_count / len(image_paths)))
-                progress_text = f"🔄 Processing image {processed_count} of {len(image_paths)}..."
-                progress_callback(progress_value, progress_text)
+        all_file_data, received_count = _hash_path_batches(path_batches, total_files, file_stats, progress_callback)
 
         stats["hashing_time"] = time.monotonic() - start_time
+        stats["files_processed"] = received_count
         stats["images_hashed"] = len(all_file_data)
-        stats["failed_files"] = len(image_paths) - len(all_file_data)
-        logging.info(f"Validation and hashing completed in {stats['hashing_time']:.2f} seconds.")
+        stats["failed_files"] = received_count - len(all_file_data)
+        logging.info("Validation and hashing completed in %.2f seconds.", stats['hashing_time'])
 
         # Step 2: Comparison and grouping
         start_time = time.monotonic()
-        progress_callback(75, "Building BK-tree for fast search...")
+        progress_callback(75, "Preparing hashes for comparison...")
 
+        if not received_count:
+            progress_callback(100, "No image files to check.")
+            return stats, all_file_data, groups
         if not all_file_data:
             progress_callback(100, "No images could be hashed.")
             return stats, all_file_data, groups
@@ -103,50 +295,45 @@ def batch_duplicate_check(image_paths, threshold, progress_callback):
             hash_to_paths[data.hash].append(path)
 
         unique_hashes = list(hash_to_paths.keys())
-        def hamming_distance(h1, h2):
-            return bin(h1 ^ h2).count('1')
-        tree = pybktree.BKTree(hamming_distance, unique_hashes)
+        # 64-bit dhashes packed into a contiguous array for vectorized comparison
+        hash_array = np.array(unique_hashes, dtype=np.uint64)
 
         progress_callback(80, "Comparing images and building groups...")
 
-        group_engine = GroupMatchEngine(threshold)
-        processed_hashes = set()
-        for i, h in enumerate(unique_hashes):
-            if h in processed_hashes:
-                continue
-            found_matches_with_dist = tree.find(h, threshold)
-            for dist, match_h in found_matches_with_dist:
-                path1 = hash_to_paths[h][0]
-                path2 = hash_to_paths[match_h][0]
-                if path1 != path2:
-                    group_engine.add_match(path1, path2, dist)
-            for _, match_h in found_matches_with_dist:
-                processed_hashes.add(match_h)
-            if (i + 1) % 50 == 0:
-                progress_callback(
-                    int(80 + 20 * ((i + 1) / len(unique_hashes))),
-                    f"Comparing group {i + 1}/{len(unique_hashes)}..."
-                )
-
-        final_groups = []
-        raw_groups = group_engine.get_groups()
-        for group in raw_groups:
-            expanded_group = set()
-            for path in group:
-                # Use .get() to avoid KeyError if a path is somehow not in all_file_data
-                metadata = all_file_data.get(path)
-                if metadata and metadata.hash:
-                    expanded_group.update(hash_to_paths[metadata.hash])
-            if len(expanded_group) > 1:
-                final_groups.append(list(expanded_group))
-
-        groups = final_groups
+        pairs = list(_find_matching_pairs(hash_array, threshold, progress_callback))
+        if pairs:
+            i_indices = np.concatenate([i for i, _, _ in pairs])
+            j_indices = np.concatenate([j for _, j, _ in pairs])
+            labels = _connected_components(len(unique_hashes), i_indices, j_indices)
+        else:
+            labels = np.arange(len(unique_hashes))
+
+        # Only groups of two or more files are kept. Files with identical hashes
+        # count as duplicates even without a near match.
+        path_counts = np.fromiter(
+            (len(paths) for paths in hash_to_paths.values()), dtype=np.int64, count=len(unique_hashes)
+        )
+        files_per_group = np.bincount(labels, weights=path_counts, minlength=len(unique_hashes))
+        kept_indices = np.flatnonzero(files_per_group[labels] > 1)
+        # Kept hashes sorted by group label, so each group is one contiguous run
+        order = kept_indices[np.argsort(labels[kept_indices], kind="stable")]
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        if len(order):
+            for hash_indices in np.split(order, boundaries):
+                groups.append([path for index in hash_indices.tolist() for path in hash_to_paths[unique_hashes[index]]])
+
         stats["comparison_time"] = time.monotonic() - start_time
-        logging.info(f"Comparison completed in {stats['comparison_time']:.2f} seconds. Found {len(groups)} duplicate groups.")
+        logging.info("Comparison completed in %.2f seconds. Found %s duplicate groups.", stats['comparison_time'], len(groups))
         progress_callback(100, "Check complete.")
 
         return stats, all_file_data, groups
 
     except Exception as e:
-        logging.critical(f"An unexpected error occurred in batch_duplicate_check: {e}", exc_info=True)
+        logging.critical("An unexpected error occurred in stream_duplicate_check: %s", e, exc_info=True)
         raise e
+
+def batch_duplicate_check(image_paths, threshold, progress_callback, file_stats=None):
+    """
+    Takes a list of validated files, hashes them, finds duplicates, and returns the results.
+    """
+    return stream_duplicate_check([image_paths], len(image_paths), threshold, progress_callback, file_stats)
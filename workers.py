@@ -1,189 +1,657 @@
 # workers.py
 import os
+import gc
+import errno
 import shutil
 import logging
 import time
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+import math
+import queue
+import functools
+import threading
+import importlib.metadata
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- NEW: Added send2trash for safe deletion ---
 import send2trash
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, QRunnable, Signal
 
-from file_handler import scan_directory, ensure_files_are_local
-from visual_duplicate_checker import batch_duplicate_check
+from file_handler import iter_scan_directory, iter_batches_as_local, put_unless_stopped
+from visual_duplicate_checker import stream_duplicate_check
 from automatic_selector import AutomaticSelector, SelectionStrategy
 
-# --- NEW: Replaced FileMover with the more capable ActionWorker ---
-class ActionWorker(QObject):
+# AutomaticSelector holds no per-run state, so one instance (and its compiled regex) serves all checks
+_SHARED_SELECTOR = AutomaticSelector()
+
+# Threads used for file actions. These block on filesystem calls, so more threads than cores help.
+ACTION_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Upper bound on the number of files handled per action task
+ACTION_BATCH_SIZE = 64
+# Bytes requested per os.copy_file_range call when copying to another device
+KERNEL_COPY_CHUNK_SIZE = 1 << 30
+# Action log messages are sent to the GUI in batches of this many, or after this many seconds
+ACTION_LOG_BATCH_SIZE = 50
+ACTION_LOG_FLUSH_INTERVAL = 0.1
+
+# Minimum time between two progress signals sent to the GUI thread (~60 Hz)
+PROGRESS_MIN_INTERVAL = 0.016
+# Minimum time between two partial scan summaries shown while the folder is being scanned
+SCAN_SUMMARY_MIN_INTERVAL = 0.25
+# Maximum number of batches handed from one check stage to the next that may wait in a queue
+PIPELINE_QUEUE_MAX_SIZE = 1024
+# Put on a stage's queue once its producer is exhausted
+_PIPELINE_DONE = object()
+
+# Results of earlier checks, so checking an unchanged folder again skips scanning and hashing.
+# Maps (folder, threshold) to (scan_summary, check_statistics, all_file_data, groups).
+_RESULT_CACHE = {}
+_RESULT_CACHE_LOCK = threading.Lock()
+RESULT_CACHE_MAX_SIZE = 4
+
+# Destination folders already created in this session, so later runs skip the mkdir call
+_CREATED_DIRS: set[str] = set()
+
+class ThrottledEmitter:
     """
-    Worker to perform file actions: moving, recycling, and sorting.
+    Wraps a signal's emit() so that per-file progress updates reach the GUI thread
+    at most ~60 times per second. Calls for which is_milestone(*args) returns True
+    are always emitted.
     """
+    def __init__(self, emit, is_milestone, min_interval=PROGRESS_MIN_INTERVAL):
+        self._emit = emit
+        self._is_milestone = is_milestone
+        self._min_interval = min_interval
+        self._last_emit_time = None
+        self._last_args = None
+
+    def __call__(self, *args):
+        now = time.monotonic()
+        if (self._last_emit_time is None or self._is_milestone(self._last_args, args)
+                or now - self._last_emit_time >= self._min_interval):
+            self._last_emit_time = now
+            self._last_args = args
+            self._emit(*args)
+
+def _is_progress_milestone(last_args, args):
+    """A progress update is always shown when the percentage changes or the check is done."""
+    value = args[0]
+    return value >= 100 or last_args is None or value != last_args[0]
+
+def _is_download_milestone(last_args, args):
+    """The last download of a batch is always shown."""
+    current, total = args
+    return current >= total
+
+@functools.lru_cache(maxsize=4096)
+def _joined(folder, name):
+    """Memoized os.path.join for destination folders that are reused across runs."""
+    return os.path.join(folder, name)
+
+def _ensure_dir(folder):
+    """Creates a destination folder unless it was already created in this session."""
+    if folder in _CREATED_DIRS:
+        return
+    os.makedirs(folder, exist_ok=True)
+    _CREATED_DIRS.add(folder)
+
+def _normalize_folder(folder_path):
+    """Returns a folder path in a form that can be compared with other paths."""
+    return os.path.normcase(os.path.abspath(folder_path))
+
+def _folders_overlap(folder_a, folder_b):
+    """Checks whether one of two normalized folders is inside the other (or they are the same)."""
+    try:
+        return os.path.commonpath([folder_a, folder_b]) in (folder_a, folder_b)
+    except ValueError:
+        # On different drives
+        return False
+
+def _dirs_unchanged(dir_mtimes):
+    """
+    Checks that no directory visited by the scan has a different mtime_ns, i.e. that no
+    file or subdirectory was added, removed or renamed anywhere in the folder since.
+    """
+    for directory, mtime_ns in dir_mtimes.items():
+        if mtime_ns is None:
+            return False
+        try:
+            if os.stat(directory).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+def _files_unchanged(file_stats):
+    """
+    Checks that every image found by the scan still has the size and modification time
+    it had then. Directory mtimes do not change when a file is edited in place.
+    """
+    for path, file_stat in file_stats.items():
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            return False
+        if (stat_info.st_size, stat_info.st_mtime_ns) != file_stat:
+            return False
+    return True
+
+def _get_cached_result(cache_key):
+    """Returns (scan_summary, check_statistics, all_file_data, groups) if the folder is unchanged, or None."""
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(cache_key)
+    if cached is None:
+        return None
+    scan_summary = cached[0]
+    # Directories first: there are far fewer of them, and they catch added and removed files
+    if not _dirs_unchanged(scan_summary["dir_mtimes"]) or not _files_unchanged(scan_summary["candidate_stats"]):
+        return None
+    return cached
+
+def _store_result(cache_key, scan_summary, check_statistics, all_file_data, groups):
+    """Remembers the results of a check, dropping the oldest entry when the cache is full."""
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE.pop(cache_key, None)
+        if len(_RESULT_CACHE) >= RESULT_CACHE_MAX_SIZE:
+            del _RESULT_CACHE[next(iter(_RESULT_CACHE))]
+        _RESULT_CACHE[cache_key] = (scan_summary, check_statistics, all_file_data, groups)
+
+def invalidate_results(folder_path):
+    """
+    Forgets cached check results for any folder overlapping folder_path. Called when
+    files are moved or recycled, so the next check does not have to detect the changes.
+    """
+    folder = _normalize_folder(folder_path)
+    with _RESULT_CACHE_LOCK:
+        for cache_key in [key for key in _RESULT_CACHE if _folders_overlap(key[0], folder)]:
+            del _RESULT_CACHE[cache_key]
+
+def _send2trash_accepts_lists():
+    """send2trash accepts a list of paths, trashed in a single operation, since version 1.8."""
+    try:
+        version = importlib.metadata.version("Send2Trash")
+        return tuple(int(part) for part in version.split(".")[:2]) >= (1, 8)
+    except (importlib.metadata.PackageNotFoundError, ValueError):
+        return False
+
+SEND2TRASH_ACCEPTS_LISTS = _send2trash_accepts_lists()
+
+def _split_into_chunks(paths):
+    """Splits paths into chunks for the action threads, small enough that all threads get work."""
+    paths = list(paths)
+    chunk_size = max(1, min(ACTION_BATCH_SIZE, math.ceil(len(paths) / ACTION_MAX_WORKERS)))
+    return [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+def _source_missing(error, file_path):
+    """
+    Checks whether an action failed only because its source file no longer exists,
+    which is not logged. Other FileNotFoundErrors (e.g. no trash folder) still are.
+    """
+    return isinstance(error, FileNotFoundError) and not os.path.lexists(file_path)
+
+def _timed(iterable, statistics, key):
+    """Yields from iterable and stores the time until it was exhausted in statistics[key]."""
+    start_time = time.monotonic()
+    yield from iterable
+    statistics[key] = time.monotonic() - start_time
+
+def _iter_in_thread(iterable, name, maxsize=PIPELINE_QUEUE_MAX_SIZE):
+    """
+    Runs a pipeline stage (an iterable, e.g. a generator) on its own thread and yields
+    its items through a bounded queue, so the stage keeps working while the caller
+    handles earlier items, but never gets more than maxsize items ahead.
+    An exception in the stage is re-raised here. If the caller stops early, the
+    stage is stopped at its next item.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put_unless_stopped(items, (True, item), stop):
+                    break
+            else:
+                put_unless_stopped(items, (False, _PIPELINE_DONE), stop)
+        except Exception as e:
+            put_unless_stopped(items, (False, e), stop)
+        finally:
+            close = getattr(iterable, "close", None)
+            if close:
+                close()
+
+    threading.Thread(target=produce, name=name, daemon=True).start()
+    try:
+        while True:
+            is_item, value = items.get()
+            if not is_item:
+                if value is _PIPELINE_DONE:
+                    return
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+class DataCarrier:
+    """
+    Carries a signal's payload by reference. Large results (e.g. all_file_data) are
+    passed to the GUI thread as one object pointer instead of being converted as
+    dict and list arguments.
+    """
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+@dataclass(slots=True)
+class _ActionStats:
+    """Counters of an ActionWorker run, emitted as a dict when it has finished."""
+    moved: int = 0
+    recycled: int = 0
+    sorted: int = 0
+    failed: int = 0
+    move_time: float = 0.0
+
+class ActionWorkerSignals(QObject):
+    """Signals for ActionWorker. QRunnable is not a QObject, so it cannot define signals itself."""
     finished = Signal(dict)
     progress_log = Signal(str)
 
+# --- NEW: Replaced FileMover with the more capable ActionWorker ---
+class ActionWorker(QRunnable):
+    """
+    Worker to perform file actions: moving, recycling, and sorting.
+    Runs on the shared QThreadPool; results are reported through self.signals.
+    """
     def __init__(self, action_config):
         super().__init__()
+        self.signals = ActionWorkerSignals()
         self.config = action_config
 
-    def _get_unique_path(self, path):
-        """Generates a unique path by appending a number if the original exists."""
-        if not os.path.exists(path):
-            return path
-        
-        parent = Path(path).parent
-        stem = Path(path).stem
-        suffix = Path(path).suffix
+    def _get_unique_path(self, dest_prefix, file_name):
+        """
+        Generates a unique path for file_name in the folder dest_prefix (which ends with
+        a separator), appending a number if the original exists.
+        The path is reserved by atomically creating an empty file there (O_CREAT | O_EXCL),
+        so parallel actions never pick the same destination.
+        """
+        candidate = dest_prefix + file_name
+        stem, suffix = os.path.splitext(file_name)
         counter = 1
         while True:
-            new_path = parent / f"{stem}_{counter}{suffix}"
-            if not new_path.exists():
-                return str(new_path)
-            counter += 1
+            try:
+                os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return candidate
+            except FileExistsError:
+                candidate = f"{dest_prefix}{stem}_{counter}{suffix}"
+                counter += 1
+
+    def _fast_move(self, src, dest, same_device=True):
+        """
+        Moves a file with a single os.replace (MoveFileEx on Windows). Only a move to
+        another volume (EXDEV) falls back to copying and deleting; any other error is
+        raised immediately instead of being retried as a copy.
+        If the destination is known to be on another device, it is copied right away.
+        """
+        if same_device:
+            try:
+                os.replace(src, dest)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        if hasattr(os, "copy_file_range"):
+            try:
+                self._kernel_copy(src, dest)
+            except OSError as e:
+                # E.g. not supported between these filesystems; shutil.move overwrites the partial copy
+                logging.debug("copy_file_range failed for %s, falling back to shutil.move: %s", src, e)
+            else:
+                os.unlink(src)
+                return
+        shutil.move(src, dest)
+
+    def _kernel_copy(self, src, dest):
+        """
+        Copies a file's data with os.copy_file_range, so it never passes through Python, then its metadata.
+        Raises OSError if the copy came out short, since some filesystems return 0 before the end of the file.
+        """
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(), KERNEL_COPY_CHUNK_SIZE):
+                pass
+            src_size = os.fstat(fsrc.fileno()).st_size
+            dest_size = os.fstat(fdst.fileno()).st_size
+            if dest_size != src_size:
+                raise OSError(errno.EIO, f"copy_file_range copied {dest_size} of {src_size} bytes", src)
+        shutil.copystat(src, dest)
+
+    def _is_source_device(self, folder):
+        """
+        Checks once per destination folder whether it is on the same device as the
+        scanned folder, so moves are known to be renames or copies up front.
+        """
+        source_device = self.config.get('source_device')
+        if source_device is None:
+            # Unknown, so let the rename decide
+            return True
+        try:
+            return os.stat(folder).st_dev == source_device
+        except FileNotFoundError:
+            # Removed since an earlier run created it
+            _CREATED_DIRS.discard(folder)
+            _ensure_dir(folder)
+            return os.stat(folder).st_dev == source_device
+
+    def _move_to_folder(self, file_path, file_name, dest_prefix, same_device):
+        """
+        Moves a file into the folder dest_prefix under a unique name. If the move fails,
+        the reserved destination is removed again and the error is re-raised.
+        """
+        try:
+            unique_dest_path = self._get_unique_path(dest_prefix, file_name)
+        except FileNotFoundError:
+            # The destination folder was removed since it was created, so create it again
+            folder = os.path.dirname(dest_prefix)
+            _CREATED_DIRS.discard(folder)
+            _ensure_dir(folder)
+            unique_dest_path = self._get_unique_path(dest_prefix, file_name)
+        try:
+            self._fast_move(file_path, unique_dest_path, same_device)
+        except BaseException:
+            try:
+                os.remove(unique_dest_path)
+            except OSError:
+                pass
+            raise
+
+    def _recycle_one(self, file_path):
+        """Sends a single file to the recycle bin. Runs on an action thread."""
+        try:
+            send2trash.send2trash(file_path)
+        except Exception as e:
+            if not _source_missing(e, file_path):
+                logging.error("Failed to recycle %s: %s", file_path, e)
+            return {"status": "failed", "msg": None}
+        return self._recycled(file_path)
+
+    def _recycled(self, file_path):
+        """Logs and returns the result for a file that was sent to the recycle bin."""
+        msg = f"RECYCLED: {os.path.basename(file_path)}"
+        logging.info(msg)
+        return {"status": "recycled", "msg": msg}
+
+    def _recycle_files(self, file_paths):
+        """
+        Sends a chunk of files to the recycle bin, in a single send2trash call where
+        supported. Runs on an action thread. Returns one result per file.
+        """
+        if SEND2TRASH_ACCEPTS_LISTS and len(file_paths) > 1:
+            # Needed to tell which files the batch recycled if it fails partway
+            existed = [os.path.lexists(file_path) for file_path in file_paths]
+            try:
+                send2trash.send2trash(file_paths)
+            except Exception as e:
+                logging.warning("Could not recycle %s files at once, retrying one by one: %s", len(file_paths), e)
+                results = []
+                for file_path, was_there in zip(file_paths, existed):
+                    if os.path.lexists(file_path):
+                        results.append(self._recycle_one(file_path))
+                    elif was_there:
+                        # Recycled by the batch before the error
+                        results.append(self._recycled(file_path))
+                    else:
+                        results.append({"status": "failed", "msg": None})
+                return results
+            return [self._recycled(file_path) for file_path in file_paths]
+        return [self._recycle_one(file_path) for file_path in file_paths]
+
+    def _move_files(self, file_paths, dest_prefix, same_device):
+        """Moves a chunk of files to the duplicates folder. Runs on an action thread."""
+        return [self._move_one(file_path, dest_prefix, same_device) for file_path in file_paths]
+
+    def _sort_files(self, file_paths, category, target_prefix, same_device):
+        """Moves a chunk of kept files into their category subfolder. Runs on an action thread."""
+        return [self._sort_one(file_path, category, target_prefix, same_device) for file_path in file_paths]
+
+    def _move_one(self, file_path, dest_prefix, same_device):
+        """Moves a single file to the duplicates folder."""
+        file_name = os.path.basename(file_path)
+        try:
+            self._move_to_folder(file_path, file_name, dest_prefix, same_device)
+        except Exception as e:
+            if not _source_missing(e, file_path):
+                logging.error("Failed to move %s: %s", file_path, e)
+            return {"status": "failed", "msg": None}
+        msg = f"MOVED: {file_name} to Duplicates folder"
+        logging.info(msg)
+        return {"status": "moved", "msg": msg}
+
+    def _sort_one(self, file_path, category, target_prefix, same_device):
+        """Moves a single kept file into its category subfolder."""
+        file_name = os.path.basename(file_path)
+        try:
+            self._move_to_folder(file_path, file_name, target_prefix, same_device)
+        except Exception as e:
+            if not _source_missing(e, file_path):
+                logging.error("Failed to sort %s: %s", file_path, e)
+            return {"status": "failed", "msg": None}
+        msg = f"SORTED: {file_name} to '{category}'"
+        logging.info(msg)
+        return {"status": "sorted", "msg": msg}
 
     def run(self):
         """Main method to run all configured file actions."""
-        start_time = time.monotonic()
-        stats = {"moved": 0, "recycled": 0, "sorted": 0, "failed": 0}
+        # Every file creates short-lived objects, but no reference cycles. Pausing the
+        # cyclic garbage collector keeps its collections from stalling all action threads.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            stats = self._perform_actions()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        self.signals.finished.emit(asdict(stats))
+
+    def _perform_actions(self):
+        """Runs the configured actions in parallel and returns their _ActionStats."""
+        start_ns = time.perf_counter_ns()
+        stats = _ActionStats()
+        # Each task is (function, args) for a chunk of files; the filesystem calls run in parallel below
+        tasks = []
 
         # --- Action 1: Handle files marked for removal ---
         files_for_removal = self.config.get('files_for_removal', [])
         remains_action = self.config.get('remains_action', 'recycle')
         duplicates_folder = self.config.get('duplicates_folder')
+        source_folder = self.config.get('source_folder')
+
+        # Earlier check results for these folders are outdated after this run
+        for folder in (source_folder, duplicates_folder):
+            if folder:
+                invalidate_results(folder)
 
         if remains_action == 'recycle':
-            for file_path in files_for_removal:
-                try:
-                    if os.path.exists(file_path):
-                        send2trash.send2trash(file_path)
-                        msg = f"RECYCLED: {os.path.basename(file_path)}"
-                        logging.info(msg)
-                        self.progress_log.emit(msg)
-                        stats["recycled"] += 1
-                    else:
-                        stats["failed"] += 1
-                except Exception as e:
-                    logging.error(f"Failed to recycle {file_path}: {e}")
-                    stats["failed"] += 1
-        
+            tasks.extend((self._recycle_files, (chunk,)) for chunk in _split_into_chunks(files_for_removal))
+
         elif remains_action == 'move' and duplicates_folder:
-            os.makedirs(duplicates_folder, exist_ok=True)
-            for file_path in files_for_removal:
-                try:
-                    if os.path.exists(file_path):
-                        dest_path = os.path.join(duplicates_folder, os.path.basename(file_path))
-                        unique_dest_path = self._get_unique_path(dest_path)
-                        shutil.move(file_path, unique_dest_path)
-                        msg = f"MOVED: {os.path.basename(file_path)} to Duplicates folder"
-                        logging.info(msg)
-                        self.progress_log.emit(msg)
-                        stats["moved"] += 1
-                    else:
-                        stats["failed"] += 1
-                except Exception as e:
-                    logging.error(f"Failed to move {file_path}: {e}")
-                    stats["failed"] += 1
+            _ensure_dir(duplicates_folder)
+            same_device = self._is_source_device(duplicates_folder)
+            # Destinations are built by appending the file name to this prefix
+            dest_prefix = os.path.join(duplicates_folder, '')
+            tasks.extend((self._move_files, (chunk, dest_prefix, same_device))
+                         for chunk in _split_into_chunks(files_for_removal))
 
         # --- Action 2: Handle sorting for unique versions ---
         files_to_sort = self.config.get('files_to_sort', {})
-        source_folder = self.config.get('source_folder')
         
         if self.config.get('enable_sorting') and source_folder and files_to_sort:
             for category, paths in files_to_sort.items():
                 if not paths:
                     continue
                 
-                target_subfolder = os.path.join(source_folder, category)
-                os.makedirs(target_subfolder, exist_ok=True)
-                
-                for file_path in paths:
-                    try:
-                        if os.path.exists(file_path):
-                            dest_path = os.path.join(target_subfolder, os.path.basename(file_path))
-                            unique_dest_path = self._get_unique_path(dest_path)
-                            shutil.move(file_path, unique_dest_path)
-                            msg = f"SORTED: {os.path.basename(file_path)} to '{category}'"
-                            logging.info(msg)
-                            self.progress_log.emit(msg)
-                            stats["sorted"] += 1
+                target_subfolder = _joined(source_folder, category)
+                _ensure_dir(target_subfolder)
+                same_device = self._is_source_device(target_subfolder)
+                target_prefix = os.path.join(target_subfolder, '')
+                tasks.extend((self._sort_files, (chunk, category, target_prefix, same_device))
+                             for chunk in _split_into_chunks(paths))
+
+        if tasks:
+            # Messages are joined into one signal per batch instead of one per file
+            log_buffer = []
+            last_flush_time = time.monotonic()
+            with ThreadPoolExecutor(max_workers=min(ACTION_MAX_WORKERS, len(tasks))) as executor:
+                futures = [executor.submit(function, *args) for function, args in tasks]
+                # Results are aggregated here, so signals are only emitted from this thread
+                for future in as_completed(futures):
+                    for result in future.result():
+                        # Plain attribute increments; a lookup by status name would be slower
+                        status = result["status"]
+                        if status == "moved":
+                            stats.moved += 1
+                        elif status == "recycled":
+                            stats.recycled += 1
+                        elif status == "sorted":
+                            stats.sorted += 1
                         else:
-                            stats["failed"] += 1
-                    except Exception as e:
-                        logging.error(f"Failed to sort {file_path}: {e}")
-                        stats["failed"] += 1
+                            stats.failed += 1
+                        if result["msg"]:
+                            log_buffer.append(result["msg"])
+                    now = time.monotonic()
+                    if log_buffer and (len(log_buffer) >= ACTION_LOG_BATCH_SIZE
+                                       or now - last_flush_time >= ACTION_LOG_FLUSH_INTERVAL):
+                        self.signals.progress_log.emit("\n".join(log_buffer))
+                        log_buffer.clear()
+                        last_flush_time = now
+            if log_buffer:
+                self.signals.progress_log.emit("\n".join(log_buffer))
 
-        stats["move_time"] = time.monotonic() - start_time
-        self.finished.emit(stats)
+        stats.move_time = (time.perf_counter_ns() - start_ns) / 1e9
+        return stats
 
 
-class DuplicateChecker(QObject):
-    """
-    The main worker for the entire duplicate check process.
-    Handles scanning, downloading, hashing, and selection.
-    """
+class DuplicateCheckerSignals(QObject):
+    """Signals for DuplicateChecker."""
     scan_summary_ready = Signal(dict)
     download_progress = Signal(int, int)
-    manual_check_finished = Signal(dict, dict, list) # stats, all_file_data, groups
+    manual_check_finished = Signal(object) # DataCarrier of (stats, all_file_data, groups)
     # --- CHANGED: Signal now returns files_to_sort as well ---
-    automatic_selection_finished = Signal(list, dict, dict) # files_for_removal, files_to_sort, stats
+    automatic_selection_finished = Signal(object) # DataCarrier of (files_for_removal, files_to_sort, stats)
     progress_updated = Signal(int, str)
     error_occurred = Signal(str)
 
+class DuplicateChecker(QRunnable):
+    """
+    The main worker for the entire duplicate check process.
+    Handles scanning, downloading, hashing, and selection.
+    Runs on the shared QThreadPool; results are reported through self.signals.
+    """
     def __init__(self, folder_path, threshold, mode, strategy):
         super().__init__()
+        self.signals = DuplicateCheckerSignals()
         self.folder_path = folder_path
         self.threshold = threshold
         self.mode = mode
         self.strategy = strategy
-        self.automatic_selector = AutomaticSelector()
+        self.automatic_selector = _SHARED_SELECTOR
+
+    def _report_scan_batches(self, scan_batches, scan_summary):
+        """
+        Passes on the candidate batches of a running scan, showing partial scan
+        summaries while it runs and the complete summary once it has finished.
+        """
+        last_report_time = time.monotonic()
+        for batch in scan_batches:
+            now = time.monotonic()
+            if now - last_report_time >= SCAN_SUMMARY_MIN_INTERVAL:
+                last_report_time = now
+                # A snapshot, since scan_summary keeps changing on this thread
+                self.signals.scan_summary_ready.emit({
+                    "total_files": scan_summary["total_files"], "scan_complete": False,
+                    "image_files": dict(scan_summary["image_files"]),
+                    "other_files": dict(scan_summary["other_files"])
+                })
+            yield batch
+        self.signals.scan_summary_ready.emit(scan_summary)
+
+    def _emit_results(self, check_statistics, all_file_data, groups, report_progress):
+        """Emits the results for the selected mode, running the automatic selection first if needed."""
+        if not check_statistics["files_processed"]:
+            report_progress(100, "No image files found.")
+            if self.mode == "Manual review":
+                self.signals.manual_check_finished.emit(DataCarrier((check_statistics, {}, [])))
+            else:
+                self.signals.automatic_selection_finished.emit(DataCarrier(([], {}, check_statistics)))
+            return
+
+        check_statistics['groups_found'] = len(groups)
+
+        if not groups:
+            if self.mode == "Manual review":
+                self.signals.manual_check_finished.emit(DataCarrier((check_statistics, all_file_data, [])))
+            else:
+                self.signals.automatic_selection_finished.emit(DataCarrier(([], {}, check_statistics)))
+            return
+
+        if self.mode == "Manual review":
+            self.signals.manual_check_finished.emit(DataCarrier((check_statistics, all_file_data, groups)))
+        else:
+            # Step 4: Automatic selection
+            start_ns_auto = time.perf_counter_ns()
+            files_for_removal, files_to_sort = self.automatic_selector.run_automatic_selection(
+                groups, self.strategy, all_file_data
+            )
+            check_statistics["automatic_selection_time"] = (time.perf_counter_ns() - start_ns_auto) / 1e9
+            logging.info("Automatic selection completed in %.2f seconds.", check_statistics['automatic_selection_time'])
+            self.signals.automatic_selection_finished.emit(DataCarrier((files_for_removal, files_to_sort, check_statistics)))
 
     def run(self):
+        report_progress = ThrottledEmitter(self.signals.progress_updated.emit, _is_progress_milestone)
+        report_download_progress = ThrottledEmitter(self.signals.download_progress.emit, _is_download_milestone)
         try:
-            # Step 1: Scan
-            self.progress_updated.emit(0, "Scanning folder...")
-            scan_summary = scan_directory(self.folder_path)
-            self.scan_summary_ready.emit(scan_summary)
-            check_statistics = {"scan_time": scan_summary.get("scan_duration", 0)}
-            candidate_paths = scan_summary.get("candidate_paths", [])
-
-            if not candidate_paths:
-                self.progress_updated.emit(100, "No image files found.")
-                if self.mode == "Manual review":
-                    self.manual_check_finished.emit(check_statistics, {}, [])
-                else:
-                    self.automatic_selection_finished.emit([], {}, check_statistics)
+            cache_key = (_normalize_folder(self.folder_path), self.threshold)
+            cached = _get_cached_result(cache_key)
+            if cached is not None:
+                scan_summary, check_statistics, all_file_data, groups = cached
+                logging.info("Folder and its images are unchanged since the last check, reusing its results.")
+                self.signals.scan_summary_ready.emit(scan_summary)
+                # Copies, since the GUI clears its group list and adds run statistics
+                self._emit_results(dict(check_statistics), all_file_data, list(groups), report_progress)
                 return
 
-            # Step 2: Download (if needed)
-            download_duration = ensure_files_are_local(candidate_paths, self.download_progress.emit)
-            check_statistics["download_time"] = download_duration
-
-            # Step 3: Hashing, validation, and comparison
-            check_results, all_file_data, groups = batch_duplicate_check(
-                candidate_paths, self.threshold, self.progress_updated.emit
+            # Step 1 - 3: Scan, download (if needed), hashing, validation, and comparison.
+            # The steps overlap: each batch of images is passed on as soon as the scanner finds
+            # it, local files are hashed right away, and each downloaded file as soon as it arrives.
+            # Scanning and downloading run on their own thread, hashing on this one.
+            report_progress(0, "Scanning folder...")
+            scan_summary = {}
+            check_statistics = {}
+            scan_batches = self._report_scan_batches(iter_scan_directory(self.folder_path, scan_summary), scan_summary)
+            if scan_summary["needs_download"]:
+                local_batches = _timed(
+                    iter_batches_as_local(scan_batches, report_download_progress),
+                    check_statistics, "download_time"
+                )
+            else:
+                # No file can be online-only, so the download step is skipped
+                local_batches = (paths for paths, _ in scan_batches)
+            check_results, all_file_data, groups = stream_duplicate_check(
+                _iter_in_thread(local_batches, "ScanDownloadStage"), None, self.threshold, report_progress,
+                scan_summary["candidate_stats"]
             )
+            if not scan_summary["needs_download"]:
+                # Nothing was downloaded, also when the scan found no online-only files
+                check_statistics["download_time"] = 0.0
+            check_statistics["scan_time"] = scan_summary["scan_duration"]
             check_statistics.update(check_results)
-            check_statistics['groups_found'] = len(groups)
 
-            if not groups:
-                if self.mode == "Manual review":
-                    self.manual_check_finished.emit(check_statistics, all_file_data, [])
-                else:
-                    self.automatic_selection_finished.emit([], {}, check_statistics)
-                return
+            # A later hit costs no scanning, downloading, hashing or comparison time
+            cached_statistics = dict(check_statistics, scan_time=0.0, download_time=0.0,
+                                     hashing_time=0.0, comparison_time=0.0)
+            _store_result(cache_key, scan_summary, cached_statistics, all_file_data, list(groups))
 
-            if self.mode == "Manual review":
-                self.manual_check_finished.emit(check_statistics, all_file_data, groups)
-            else:
-                # Step 4: Automatic selection
-                start_time_auto = time.monotonic()
-                files_for_removal, files_to_sort = self.automatic_selector.run_automatic_selection(
-                    groups, self.strategy, all_file_data
-                )
-                check_statistics["automatic_selection_time"] = time.monotonic() - start_time_auto
-                logging.info(f"Automatic selection completed in {check_statistics['automatic_selection_time']:.2f} seconds.")
-                self.automatic_selection_finished.emit(files_for_removal, files_to_sort, check_statistics)
+            self._emit_results(check_statistics, all_file_data, groups, report_progress)
 
         except Exception as e:
-            logging.critical(f"A critical error occurred in the duplicate check thread: {e}", exc_info=True)
-            self.error_occurred.emit(f"An error occurred during the duplicate check:\n\n{e}")
+            logging.critical("A critical error occurred in the duplicate check thread: %s", e, exc_info=True)
+            self.signals.error_occurred.emit(f"An error occurred during the duplicate check:\n\n{e}")